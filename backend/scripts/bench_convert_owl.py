@@ -0,0 +1,87 @@
+import sys
+import os
+import json
+import argparse
+import subprocess
+import tempfile
+from xml.sax.saxutils import escape
+
+TV = "http://example.org/tv-series#"
+
+HEADER = f'''<?xml version="1.0" encoding="UTF-8"?>
+<Ontology xmlns="http://www.w3.org/2002/07/owl#"
+          xml:base="http://example.org/tv-series"
+          ontologyIRI="http://example.org/tv-series">
+    <Prefix name="tv" IRI="{TV}"/>
+    <Prefix name="rdfs" IRI="http://www.w3.org/2000/01/rdf-schema#"/>
+    <Prefix name="xsd" IRI="http://www.w3.org/2001/XMLSchema#"/>
+    <Declaration><Class abbreviatedIRI="tv:TVSeries"/></Declaration>
+    <Declaration><Class abbreviatedIRI="tv:Genre"/></Declaration>
+    <Declaration><ObjectProperty abbreviatedIRI="tv:hasGenre"/></Declaration>
+    <Declaration><DataProperty abbreviatedIRI="tv:title"/></Declaration>
+    <Declaration><DataProperty abbreviatedIRI="tv:abstract"/></Declaration>
+    <Declaration><DataProperty abbreviatedIRI="tv:startDate"/></Declaration>
+    <ObjectPropertyDomain><ObjectProperty abbreviatedIRI="tv:hasGenre"/><Class abbreviatedIRI="tv:TVSeries"/></ObjectPropertyDomain>
+    <ObjectPropertyRange><ObjectProperty abbreviatedIRI="tv:hasGenre"/><Class abbreviatedIRI="tv:Genre"/></ObjectPropertyRange>
+'''
+
+SERIES = '''    <Declaration><NamedIndividual IRI="#Series_{i}"/></Declaration>
+    <ClassAssertion><Class abbreviatedIRI="tv:TVSeries"/><NamedIndividual IRI="#Series_{i}"/></ClassAssertion>
+    <ObjectPropertyAssertion><ObjectProperty abbreviatedIRI="tv:hasGenre"/><NamedIndividual IRI="#Series_{i}"/><NamedIndividual IRI="#Genre_{genre}"/></ObjectPropertyAssertion>
+    <DataPropertyAssertion><DataProperty abbreviatedIRI="tv:title"/><NamedIndividual IRI="#Series_{i}"/><Literal xml:lang="en">Series {i}</Literal></DataPropertyAssertion>
+    <DataPropertyAssertion><DataProperty abbreviatedIRI="tv:abstract"/><NamedIndividual IRI="#Series_{i}"/><Literal xml:lang="en">{abstract}</Literal></DataPropertyAssertion>
+    <DataPropertyAssertion><DataProperty abbreviatedIRI="tv:startDate"/><NamedIndividual IRI="#Series_{i}"/><Literal datatypeIRI="http://www.w3.org/2001/XMLSchema#date">2001-01-01</Literal></DataPropertyAssertion>
+    <AnnotationAssertion><AnnotationProperty abbreviatedIRI="rdfs:label"/><IRI>#Series_{i}</IRI><Literal xml:lang="en">Series {i}</Literal></AnnotationAssertion>
+'''
+
+ABSTRACT = escape("A television series about doctors, lawyers & detectives in a big city. " * 6)
+
+
+def generate_ontology(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for g in range(50):
+            f.write(f'    <ClassAssertion><Class abbreviatedIRI="tv:Genre"/><NamedIndividual IRI="#Genre_{g}"/></ClassAssertion>\n')
+        for i in range(count):
+            f.write(SERIES.format(i=i, genre=i % 50, abstract=ABSTRACT))
+        f.write("</Ontology>\n")
+
+
+def run_engine(path, engine, fmt):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "convert_owl.py")
+    result = subprocess.run(
+        [sys.executable, script, path, "--engine", engine, "--format", fmt, "--stats"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"engine": engine, "error": result.stderr.strip().splitlines()[-1]}
+    for line in result.stderr.splitlines():
+        if line.startswith("stats: "):
+            return json.loads(line[len("stats: "):])
+    return {"engine": engine, "error": "no stats reported"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark convert_owl.py on generated OWL/XML ontologies")
+    parser.add_argument("--sizes", default="10000,50000,200000",
+                        help="comma-separated number of series per generated ontology")
+    parser.add_argument("--engines", default="streaming,owlready2")
+    parser.add_argument("--format", choices=["rdfxml", "ntriples"], default="ntriples")
+    args = parser.parse_args()
+
+    print(f"{'series':>8} {'input MB':>9} {'engine':>10} {'seconds':>8} {'MB/s':>7} {'triples/s':>10} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in [int(s) for s in args.sizes.split(",")]:
+            path = os.path.join(tmp, f"synthetic_{count}.owl")
+            generate_ontology(path, count)
+            for engine in args.engines.split(","):
+                stats = run_engine(path, engine, args.format)
+                if "error" in stats:
+                    print(f"{count:>8} {'':>9} {engine:>10}  {stats['error']}")
+                    continue
+                print(f"{count:>8} {stats['input_mb']:>9} {stats['engine']:>10} {stats['seconds']:>8} "
+                      f"{stats['mb_per_sec']:>7} {stats['triples_per_sec'] or '-':>10} {stats['peak_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+import sys
+import os
+import json
+import time
+import queue
+import random
+import hashlib
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+from corpus_store import DATA_DIR, LANGUAGES, load_series
+from dedup_corpus import load_redundant
+
+ES_URL = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
+# Mismo índice y mapping que ElasticsearchService (src/modules/elasticsearch)
+INDEX_NAME = "semantic-triples"
+EMBEDDING_DIMS = 384
+DOCUMENT_ID = "harvested_data"
+
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+TV_ABSTRACT = "http://example.org/tv-series#abstract"
+
+MAX_BULK_BYTES = 5 * 1024 * 1024
+MAX_BULK_DOCS = 1000
+CONCURRENCY = 4
+MAX_RETRIES = 5
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+def index_mapping(dims=EMBEDDING_DIMS):
+    return {
+        "properties": {
+            "subject": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "predicate": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "object": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "language": {"type": "keyword"},
+            "documentId": {"type": "keyword"},
+            "text": {"type": "text"},
+            "embedding": {"type": "dense_vector", "dims": dims, "index": True, "similarity": "cosine"},
+            "suggest": {"type": "completion", "analyzer": "simple", "search_analyzer": "simple"},
+        }
+    }
+
+
+class EsError(Exception):
+    pass
+
+
+class BadResponse(http.client.HTTPException):
+    """Respuesta que no es JSON (p. ej. una página HTML de un proxy); se trata como error de transporte."""
+
+
+class KeepAliveConnection:
+    """Conexión HTTP/1.1 keep-alive (Elasticsearch o servicio de embeddings); se reabre si el servidor la corta."""
+
+    def __init__(self, url, timeout=60):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        headers = {"Content-Type": content_type} if body is not None else {}
+        if self.conn is None:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+        try:
+            data = json.loads(payload) if payload else {}
+        except ValueError:
+            self.close()
+            raise BadResponse(f"HTTP {response.status} with non-JSON body: {payload[:80]!r}")
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def document_id(lang, uri):
+    # _id determinista: reindexar o reintentar sobrescribe en vez de duplicar
+    return hashlib.sha1(f"{lang}|{uri}".encode("utf-8")).hexdigest()
+
+
+def corpus_documents(langs, data_dir=DATA_DIR, skip_redundant=True):
+    """
+    Un documento con forma de tripleta por entidad cosechada: el abstract si
+    existe, si no el label. Se saltan las entidades no canónicas de dedup_corpus.py.
+    """
+    redundant = load_redundant(data_dir) if skip_redundant else set()
+    for lang in langs:
+        entities = {}
+        with load_series(lang, data_dir) as series:
+            for record in series:
+                key = record["uri"]
+                if (lang, key) in redundant:
+                    continue
+                current = entities.get(key)
+                if current is None or len(record["abstract"]) > len(current["abstract"]):
+                    entities[key] = {"label": record["label"], "abstract": record["abstract"]}
+        for uri, entity in entities.items():
+            predicate, obj = (TV_ABSTRACT, entity["abstract"]) if entity["abstract"] else (RDFS_LABEL, entity["label"])
+            yield {
+                "lang": lang,
+                "uri": uri,
+                "subject": uri,
+                "predicate": predicate,
+                "object": obj,
+                "label": entity["label"],
+            }
+
+
+def synthetic_documents(count, seed=3):
+    rng = random.Random(seed)
+    words = ["drama", "comedia", "policial", "médicos", "hospital", "familia", "crimen", "ciencia", "ficción"]
+    for i in range(count):
+        yield {
+            "lang": LANGUAGES[i % len(LANGUAGES)],
+            "uri": f"http://example.org/tv-series#Synthetic_{i}",
+            "subject": f"http://example.org/tv-series#Synthetic_{i}",
+            "predicate": TV_ABSTRACT,
+            "object": " ".join(rng.choice(words) for _ in range(60)),
+            "label": f"Synthetic {i}",
+        }
+
+
+def attach_vectors(documents, vectors_path=None, embeddings_url=None, save_path=None,
+                   synthetic_dims=None, batch_size=64, counts=None):
+    """
+    Añade el embedding a cada documento: desde un JSONL precalculado
+    ({"lang", "uri", "embedding"}), desde el servicio de embeddings o aleatorio
+    para benchmarks. Sin ninguna fuente, los documentos van sin vector.
+    Los documentos que no están en el JSONL se cuentan en counts["missing_vectors"].
+    """
+    if vectors_path:
+        vectors = {}
+        with open(vectors_path, "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                vectors[(row["lang"], row["uri"])] = row["embedding"]
+        for doc in documents:
+            doc["embedding"] = vectors.get((doc["lang"], doc["uri"]))
+            if doc["embedding"] is None and counts is not None:
+                counts["missing_vectors"] = counts.get("missing_vectors", 0) + 1
+            yield doc
+        return
+
+    if synthetic_dims:
+        rng = random.Random(5)
+        for doc in documents:
+            doc["embedding"] = [rng.uniform(-1, 1) for _ in range(synthetic_dims)]
+            yield doc
+        return
+
+    if not embeddings_url:
+        yield from documents
+        return
+
+    embedder = KeepAliveConnection(embeddings_url, timeout=300)
+    saved = open(save_path, "w", encoding="utf-8") if save_path else None
+    try:
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield from encode_batch(embedder, batch, saved)
+                batch = []
+        if batch:
+            yield from encode_batch(embedder, batch, saved)
+    finally:
+        embedder.close()
+        if saved:
+            saved.close()
+
+
+def encode_batch(embedder, batch, saved):
+    # Mismo texto que embebe OntologyService al subir una ontología
+    texts = [f"{d['subject']} {d['predicate']} {d['object']}".strip() for d in batch]
+    status, data = embedder.request("POST", "/embed", {"texts": texts})
+    if status != 200 or len(data.get("embeddings", [])) != len(batch):
+        raise EsError(f"Embedding service error {status}: {data.get('error')}")
+    for doc, vector in zip(batch, data["embeddings"]):
+        doc["embedding"] = vector
+        if saved:
+            saved.write(json.dumps({"lang": doc["lang"], "uri": doc["uri"], "embedding": vector}) + "\n")
+        yield doc
+
+
+def bulk_item(doc, document_label=DOCUMENT_ID):
+    """Par de líneas NDJSON (acción + documento) para el _bulk."""
+    text = f"{doc['subject']} {doc['predicate']} {doc['object']}".strip()
+    source = {
+        "subject": doc["subject"],
+        "predicate": doc["predicate"],
+        "object": doc["object"],
+        "language": doc["lang"],
+        "documentId": document_label,
+        "text": text,
+        "suggest": {"input": [doc["label"] or doc["subject"]], "weight": 1},
+    }
+    if doc.get("embedding") is not None:
+        source["embedding"] = doc["embedding"]
+    action = {"index": {"_id": document_id(doc["lang"], doc["uri"])}}
+    return (json.dumps(action) + "\n" + json.dumps(source, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def pack_bulk_bodies(items, max_bytes=MAX_BULK_BYTES, max_docs=MAX_BULK_DOCS):
+    """Agrupa los items en cuerpos _bulk sin pasar de max_bytes ni max_docs."""
+    chunk, size = [], 0
+    for item in items:
+        if chunk and (size + len(item) > max_bytes or len(chunk) == max_docs):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(item)
+        size += len(item)
+    if chunk:
+        yield chunk
+
+
+class BulkIndexer:
+    """
+    Envía cuerpos _bulk con `concurrency` hilos, cada uno con su propia
+    conexión keep-alive. La cola acotada deja que el empaquetado vaya por
+    delante de los envíos sin acumular el corpus entero en memoria.
+    Los items rechazados con 429/5xx se reenvían con backoff exponencial.
+    """
+
+    def __init__(self, es_url, index, concurrency=CONCURRENCY, max_retries=MAX_RETRIES, backoff=0.5):
+        self.es_url = es_url
+        self.index = index
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.stats = {"docs": 0, "failed": 0, "bytes": 0, "requests": 0, "retried_items": 0}
+        self.errors = []
+        self.crashed = []
+
+    def run(self, bodies):
+        work = queue.Queue(maxsize=self.concurrency * 2)
+        workers = [threading.Thread(target=self.worker, args=(work,), daemon=True)
+                   for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        started = time.perf_counter()
+        try:
+            for chunk in bodies:
+                if not self.put(work, chunk, workers) or self.crashed:
+                    break
+        finally:
+            for _ in workers:
+                if not self.put(work, None, workers):
+                    break
+            for worker in workers:
+                worker.join()
+        if self.crashed:
+            # Nunca seguir (ni mover un alias) tras una pérdida sin contabilizar
+            raise EsError(f"Indexing worker died: {self.crashed[0]}")
+        elapsed = time.perf_counter() - started
+        self.stats["seconds"] = round(elapsed, 3)
+        self.stats["docs_per_sec"] = round(self.stats["docs"] / elapsed) if elapsed else None
+        self.stats["mb_per_sec"] = round(self.stats["bytes"] / elapsed / 1e6, 2) if elapsed else None
+        return self.stats
+
+    def put(self, work, item, workers):
+        """Encola sin bloquearse para siempre si ya no queda ningún worker vivo."""
+        while True:
+            try:
+                work.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if not any(worker.is_alive() for worker in workers):
+                    if not self.crashed:
+                        self.crashed.append("all workers exited")
+                    return False
+
+    def worker(self, work):
+        conn = KeepAliveConnection(self.es_url)
+        try:
+            while True:
+                chunk = work.get()
+                if chunk is None:
+                    return
+                try:
+                    self.send(conn, chunk)
+                except Exception as e:
+                    self.fail(len(chunk), repr(e))
+        except BaseException as e:
+            self.crashed.append(repr(e))
+            raise
+        finally:
+            conn.close()
+
+    def record(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def fail(self, count, reason):
+        with self.lock:
+            self.stats["failed"] += count
+            if len(self.errors) < 10:
+                self.errors.append(reason)
+
+    def send(self, conn, chunk):
+        attempt = 0
+        while chunk:
+            body = b"".join(chunk)
+            try:
+                status, data = conn.request("POST", f"/{self.index}/_bulk", body, "application/x-ndjson")
+            except (http.client.HTTPException, OSError) as e:
+                status, data = None, {"error": str(e)}
+            self.record(requests=1, bytes=len(body))
+
+            if status == 200 and len(data.get("items", [])) != len(chunk):
+                # Respuesta incompleta: reintentar el cuerpo entero
+                status, data = None, {"error": f"{len(data.get('items', []))} items for {len(chunk)} docs"}
+
+            if status == 200:
+                retry = []
+                for item, result in zip(chunk, data.get("items", [])):
+                    outcome = result.get("index", {})
+                    if outcome.get("status", 500) < 300:
+                        self.record(docs=1)
+                    elif outcome.get("status") in RETRYABLE_STATUS and attempt < self.max_retries:
+                        retry.append(item)
+                    else:
+                        self.fail(1, outcome.get("error"))
+                if retry:
+                    self.record(retried_items=len(retry))
+                chunk = retry
+            elif (status is None or status in RETRYABLE_STATUS) and attempt < self.max_retries:
+                self.record(retried_items=len(chunk))
+            else:
+                self.fail(len(chunk), f"HTTP {status}: {data.get('error')}")
+                return
+
+            if chunk:
+                attempt += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+
+def ensure_index(admin, index, dims, settings=None):
+    status, _ = admin.request("HEAD", f"/{index}")
+    if status == 200:
+        return False
+    body = {"mappings": index_mapping(dims)}
+    if settings:
+        body["settings"] = settings
+    status, data = admin.request("PUT", f"/{index}", body)
+    if status != 200:
+        raise EsError(f"Failed to create index {index}: {data}")
+    return True
+
+
+def reindex_uploads(admin, sources, dest):
+    """
+    Copia al índice nuevo las tripletas subidas desde Node (todo lo que no
+    viene de harvested_data). Los _id se conservan, así que repetirlo es idempotente.
+    """
+    if not sources:
+        return 0
+    body = {
+        "source": {"index": sources, "query": {"bool": {"must_not": {"term": {"documentId": DOCUMENT_ID}}}}},
+        "dest": {"index": dest},
+    }
+    status, data = admin.request("POST", "/_reindex?wait_for_completion=true&refresh=true", body)
+    if status != 200 or data.get("failures"):
+        raise EsError(f"Reindex of uploaded triples from {', '.join(sources)} failed: {data}")
+    return data.get("total", 0)
+
+
+def set_write_block(admin, index, blocked):
+    status, data = admin.request("PUT", f"/{index}/_settings", {"index": {"blocks.write": blocked or None}})
+    if status != 200:
+        raise EsError(f"Failed to {'block' if blocked else 'unblock'} writes on {index}: {data}")
+
+
+def blue_green(admin, alias, dims, replace_index, index_into):
+    """
+    Construye un índice nuevo, lo carga con index_into(nombre), copia las
+    tripletas subidas desde Node y mueve el alias de forma atómica. El índice
+    anterior sigue sirviendo búsquedas hasta el cambio del alias.
+    """
+    status, current = admin.request("GET", f"/_alias/{alias}")
+    old_indices = sorted(current) if status == 200 else []
+    status, _ = admin.request("HEAD", f"/{alias}")
+    concrete = status == 200 and not old_indices
+    if concrete and not replace_index:
+        raise EsError(f"'{alias}' is a concrete index, not an alias. Re-run with --replace-index "
+                      f"to replace it with an alias (uploaded triples are copied over first).")
+
+    new_index = f"{alias}-{time.strftime('%Y%m%d%H%M%S')}-{random.randrange(16 ** 4):04x}"
+    # Sin refresh durante la carga; se restaura antes de exponer el índice
+    if not ensure_index(admin, new_index, dims, {"index": {"refresh_interval": "-1"}}):
+        raise EsError(f"Index {new_index} already exists; refusing to load into it")
+    print(f"Building {new_index} for alias {alias}")
+
+    stats = index_into(new_index)
+    if stats["failed"] or stats.get("missing_vectors"):
+        raise EsError(f"{stats['failed']} documents failed, {stats.get('missing_vectors', 0)} without vector; "
+                      f"alias {alias} left unchanged, partial index {new_index} kept for inspection")
+
+    sources = [alias] if concrete else old_indices
+    print(f"Copied {reindex_uploads(admin, sources, new_index)} uploaded triples from {', '.join(sources) or '-'}")
+
+    status, data = admin.request("PUT", f"/{new_index}/_settings", {"index": {"refresh_interval": None}})
+    if status != 200:
+        raise EsError(f"Failed to restore refresh_interval on {new_index}: {data}")
+    status, data = admin.request("POST", f"/{new_index}/_refresh")
+    if status != 200:
+        raise EsError(f"Failed to refresh {new_index}: {data}")
+
+    actions = [{"remove": {"index": old, "alias": alias}} for old in old_indices]
+    if concrete:
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": new_index, "alias": alias}})
+
+    if concrete:
+        # El índice concreto se borra en el cambio de alias, así que no hay copia
+        # posterior: se bloquean las escrituras, se copia lo que llegó mientras
+        # tanto y se cambia. Las subidas durante ese intervalo fallan en Node en
+        # vez de perderse
+        set_write_block(admin, alias, True)
+        try:
+            reindex_uploads(admin, [alias], new_index)
+            swap_alias(admin, actions)
+        except BaseException:
+            set_write_block(admin, alias, False)
+            raise
+    else:
+        swap_alias(admin, actions)
+    print(f"Alias {alias} -> {new_index} (was {', '.join(old_indices) or ('index ' + alias if concrete else 'unset')})")
+
+    # Subidas que llegaron a los índices viejos entre la copia y el cambio de alias
+    if old_indices:
+        reindex_uploads(admin, old_indices, new_index)
+    return stats, old_indices
+
+
+def swap_alias(admin, actions):
+    status, data = admin.request("POST", "/_aliases", {"actions": actions})
+    if status != 200:
+        raise EsError(f"Alias swap failed: {data}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk index harvested series with embeddings into Elasticsearch")
+    parser.add_argument("langs", nargs="*", default=LANGUAGES)
+    parser.add_argument("--es-url", default=ES_URL)
+    parser.add_argument("--index", default=INDEX_NAME, help="index, or alias with --blue-green")
+    parser.add_argument("--blue-green", action="store_true", help="build a new index and swap the alias")
+    parser.add_argument("--replace-index", action="store_true",
+                        help="with --blue-green, replace a concrete index that has the alias name "
+                             "(its uploaded triples are copied to the new index)")
+    parser.add_argument("--delete-old", action="store_true", help="delete indices the alias pointed to")
+    parser.add_argument("--vectors", help="JSONL of precomputed vectors: {lang, uri, embedding}")
+    parser.add_argument("--embeddings-url", help="encode with the embedding service, e.g. http://localhost:5000")
+    parser.add_argument("--save-vectors", help="with --embeddings-url, also write the vectors as JSONL")
+    parser.add_argument("--keep-duplicates", action="store_true", help="do not skip dedup_corpus.py duplicates")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--max-bytes", type=int, default=MAX_BULK_BYTES)
+    parser.add_argument("--max-docs", type=int, default=MAX_BULK_DOCS)
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--synthetic", type=int, help="index N synthetic documents with random vectors")
+    parser.add_argument("--dims", type=int, default=EMBEDDING_DIMS)
+    parser.add_argument("--stub", action="store_true", help="run against an in-process es_stub_server")
+    parser.add_argument("--stub-reject-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from es_stub_server import start_stub
+        stub, args.es_url = start_stub(reject_rate=args.stub_reject_rate)
+        print(f"Using Elasticsearch stub at {args.es_url}")
+
+    counts = {"missing_vectors": 0}
+
+    def index_into(index):
+        bodies = pack_bulk_bodies((bulk_item(doc) for doc in documents), args.max_bytes, args.max_docs)
+        indexer = BulkIndexer(args.es_url, index, args.concurrency, args.max_retries,
+                              backoff=0.01 if args.stub else 0.5)
+        stats = indexer.run(bodies)
+        stats.update(counts)
+        for key, value in stats.items():
+            print(f"  {key}: {value}")
+        for error in indexer.errors:
+            print(f"  error: {error}")
+        if stats["missing_vectors"]:
+            print(f"Warning: {stats['missing_vectors']} documents not found in {args.vectors}, indexed without vector",
+                  file=sys.stderr)
+        return stats
+
+    admin = KeepAliveConnection(args.es_url)
+    try:
+        if args.synthetic:
+            documents = attach_vectors(synthetic_documents(args.synthetic), synthetic_dims=args.dims)
+        else:
+            documents = attach_vectors(corpus_documents(args.langs, skip_redundant=not args.keep_duplicates),
+                                       args.vectors, args.embeddings_url, args.save_vectors, counts=counts)
+
+        if args.blue_green:
+            stats, old_indices = blue_green(admin, args.index, args.dims, args.replace_index, index_into)
+            if args.delete_old:
+                for old in old_indices:
+                    status, data = admin.request("DELETE", f"/{old}")
+                    if status != 200:
+                        raise EsError(f"Failed to delete {old}: {data}")
+                    print(f"Deleted {old}")
+        else:
+            if ensure_index(admin, args.index, args.dims):
+                print(f"Created index {args.index}")
+            stats = index_into(args.index)
+    except (EsError, http.client.HTTPException, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        admin.close()
+        if stub:
+            state = stub.state
+            print(f"  stub: {state.connections} connections, {state.bulk_requests} _bulk requests, "
+                  f"{state.rejected_items} items rejected with 429")
+            stub.shutdown()
+    return 1 if stats["failed"] or stats["missing_vectors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
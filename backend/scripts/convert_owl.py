@@ -1,29 +1,433 @@
 import sys
 import os
-from owlready2 import *
+import json
+import time
+import argparse
+import re
+from collections import namedtuple
+from urllib.parse import urljoin
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape, quoteattr
 
-def convert_owl_to_rdf(input_path):
+from memory_usage import peak_rss_mb
+
+OWL = "http://www.w3.org/2002/07/owl#"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+RDF_TYPE = RDF + "type"
+RDF_PLAIN_LITERAL = RDF + "PlainLiteral"
+
+# Prefijos que OWL/XML asume aunque el archivo no los declare
+DEFAULT_PREFIXES = {
+    "owl": OWL,
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "xsd": XSD,
+    "xml": "http://www.w3.org/XML/1998/namespace",
+}
+
+DECLARATION_TYPES = {
+    "Class": OWL + "Class",
+    "Datatype": RDFS + "Datatype",
+    "ObjectProperty": OWL + "ObjectProperty",
+    "DataProperty": OWL + "DatatypeProperty",
+    "AnnotationProperty": OWL + "AnnotationProperty",
+    "NamedIndividual": OWL + "NamedIndividual",
+}
+
+PROPERTY_CHARACTERISTICS = {
+    "FunctionalObjectProperty": OWL + "FunctionalProperty",
+    "InverseFunctionalObjectProperty": OWL + "InverseFunctionalProperty",
+    "TransitiveObjectProperty": OWL + "TransitiveProperty",
+    "SymmetricObjectProperty": OWL + "SymmetricProperty",
+    "AsymmetricObjectProperty": OWL + "AsymmetricProperty",
+    "ReflexiveObjectProperty": OWL + "ReflexiveProperty",
+    "IrreflexiveObjectProperty": OWL + "IrreflexiveProperty",
+    "FunctionalDataProperty": OWL + "FunctionalProperty",
+}
+
+# Axiomas binarios entre entidades con nombre: (tipo esperado, tipo esperado, predicado)
+BINARY_AXIOMS = {
+    "SubClassOf": ("Class", "Class", RDFS + "subClassOf"),
+    "SubObjectPropertyOf": ("ObjectProperty", "ObjectProperty", RDFS + "subPropertyOf"),
+    "SubDataPropertyOf": ("DataProperty", "DataProperty", RDFS + "subPropertyOf"),
+    "SubAnnotationPropertyOf": ("AnnotationProperty", "AnnotationProperty", RDFS + "subPropertyOf"),
+    "ObjectPropertyDomain": ("ObjectProperty", "Class", RDFS + "domain"),
+    "ObjectPropertyRange": ("ObjectProperty", "Class", RDFS + "range"),
+    "DataPropertyDomain": ("DataProperty", "Class", RDFS + "domain"),
+    "DataPropertyRange": ("DataProperty", "Datatype", RDFS + "range"),
+    "InverseObjectProperties": ("ObjectProperty", "ObjectProperty", OWL + "inverseOf"),
+    "ClassAssertion": ("Class", "Individual", RDF_TYPE),
+}
+
+# Axiomas n-arios que solo se soportan con exactamente dos operandos con nombre
+PAIR_AXIOMS = {
+    "EquivalentClasses": ("Class", OWL + "equivalentClass"),
+    "DisjointClasses": ("Class", OWL + "disjointWith"),
+    "SameIndividual": ("Individual", OWL + "sameAs"),
+    "DifferentIndividuals": ("Individual", OWL + "differentFrom"),
+}
+
+NCNAME_SUFFIX = re.compile(r"[A-Za-z_][A-Za-z0-9_.\-]*$")
+
+BNode = type("BNode", (str,), {})
+Literal = namedtuple("Literal", ["value", "lang", "datatype"])
+
+
+class UnsupportedConstruct(Exception):
+    """El conversor en streaming no sabe traducir este elemento OWL/XML."""
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class NTriplesWriter:
+    extension = ".nt"
+
+    def __init__(self, out):
+        self.out = out
+
+    def start(self):
+        pass
+
+    def end(self):
+        pass
+
+    def term(self, node):
+        if isinstance(node, Literal):
+            value = (node.value.replace("\\", "\\\\").replace('"', '\\"')
+                     .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+            if node.lang:
+                return f'"{value}"@{node.lang}'
+            if node.datatype:
+                return f'"{value}"^^<{node.datatype}>'
+            return f'"{value}"'
+        if isinstance(node, BNode):
+            return f"_:{node}"
+        return f"<{node}>"
+
+    def triple(self, s, p, o):
+        self.out.write(f"{self.term(s)} <{p}> {self.term(o)} .\n")
+
+
+class RdfXmlWriter:
+    """
+    Escribe RDF/XML triple a triple.
+    Cada propiedad declara su propio namespace, así no hace falta conocer
+    todos los prefijos antes de abrir <rdf:RDF>.
+    """
+    extension = ".rdf"
+
+    def __init__(self, out):
+        self.out = out
+        self.subject = None
+        self.qnames = {}
+
+    def start(self):
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.out.write(f'<rdf:RDF xmlns:rdf="{RDF}">\n')
+
+    def end(self):
+        self.close_subject()
+        self.out.write("</rdf:RDF>\n")
+
+    def close_subject(self):
+        if self.subject is not None:
+            self.out.write("  </rdf:Description>\n")
+            self.subject = None
+
+    def split_predicate(self, p):
+        split = self.qnames.get(p)
+        if split is None:
+            match = NCNAME_SUFFIX.search(p)
+            if not match or match.start() == 0:
+                raise UnsupportedConstruct(f"Cannot serialize predicate as RDF/XML: {p}")
+            split = (p[:match.start()], match.group(0))
+            self.qnames[p] = split
+        return split
+
+    def triple(self, s, p, o):
+        if s != self.subject or isinstance(s, BNode) != isinstance(self.subject, BNode):
+            self.close_subject()
+            attr = "rdf:nodeID" if isinstance(s, BNode) else "rdf:about"
+            self.out.write(f"  <rdf:Description {attr}={quoteattr(s)}>\n")
+            self.subject = s
+
+        namespace, name = self.split_predicate(p)
+        open_tag = f"<p:{name} xmlns:p={quoteattr(namespace)}"
+        if isinstance(o, Literal):
+            if o.lang:
+                open_tag += f" xml:lang={quoteattr(o.lang)}"
+            elif o.datatype:
+                open_tag += f" rdf:datatype={quoteattr(o.datatype)}"
+            self.out.write(f"    {open_tag}>{escape(o.value)}</p:{name}>\n")
+        elif isinstance(o, BNode):
+            self.out.write(f"    {open_tag} rdf:nodeID={quoteattr(o)}/>\n")
+        else:
+            self.out.write(f"    {open_tag} rdf:resource={quoteattr(o)}/>\n")
+
+
+class StreamingOwlXmlConverter:
+    """
+    Traduce OWL/XML a triples sin cargar la ontología en memoria.
+    Cada axioma hijo de <Ontology> se procesa al cerrarse y se descarta,
+    de modo que la memoria solo crece con la tabla de prefijos.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.prefixes = dict(DEFAULT_PREFIXES)
+        self.base = ""
+        self.ontology = None
+        self.triples = 0
+        # nodeID del archivo -> etiqueta generada (los de OWLAPI son "_:genid1", no NCName)
+        self.bnodes = {}
+
+    def emit(self, s, p, o):
+        self.writer.triple(s, p, o)
+        self.triples += 1
+
+    def attribute(self, el, name):
+        if name not in el.attrib:
+            raise UnsupportedConstruct(f"{local_name(el.tag)} without {name}")
+        return el.attrib[name]
+
+    def blank_node(self, el):
+        node_id = self.attribute(el, "nodeID")
+        if node_id not in self.bnodes:
+            self.bnodes[node_id] = BNode(f"b{len(self.bnodes) + 1}")
+        return self.bnodes[node_id]
+
+    def resolve(self, el):
+        if "IRI" in el.attrib:
+            return urljoin(self.base, el.attrib["IRI"])
+        if "abbreviatedIRI" in el.attrib:
+            return self.expand(el.attrib["abbreviatedIRI"])
+        raise UnsupportedConstruct(f"Element without IRI: {local_name(el.tag)}")
+
+    def expand(self, curie):
+        prefix, _, name = curie.partition(":")
+        if prefix not in self.prefixes:
+            raise UnsupportedConstruct(f"Unknown prefix: {prefix}")
+        return self.prefixes[prefix] + name
+
+    def entity(self, el, kind):
+        name = local_name(el.tag)
+        if kind == "Individual":
+            if name == "NamedIndividual":
+                return self.resolve(el)
+            if name == "AnonymousIndividual":
+                return self.blank_node(el)
+        elif name == kind:
+            return self.resolve(el)
+        raise UnsupportedConstruct(f"Expected named {kind}, found {name}")
+
+    def literal(self, el):
+        value = el.text or ""
+        datatype = el.attrib.get("datatypeIRI")
+        lang = el.attrib.get(XML_LANG)
+        if datatype:
+            datatype = urljoin(self.base, datatype)
+        if datatype == RDF_PLAIN_LITERAL:
+            if "@" in value:
+                value, _, lang = value.rpartition("@")
+            datatype = None
+        return Literal(value, lang or None, None if lang else datatype)
+
+    def annotation_node(self, el):
+        name = local_name(el.tag)
+        if name == "IRI":
+            return urljoin(self.base, (el.text or "").strip())
+        if name == "AbbreviatedIRI":
+            return self.expand((el.text or "").strip())
+        if name == "AnonymousIndividual":
+            return self.blank_node(el)
+        if name == "Literal":
+            return self.literal(el)
+        raise UnsupportedConstruct(f"Unsupported annotation value: {name}")
+
+    def operands(self, el):
+        children = list(el)
+        if any(local_name(c.tag) == "Annotation" for c in children):
+            raise UnsupportedConstruct(f"Annotated axiom: {local_name(el.tag)}")
+        return children
+
+    def handle(self, el):
+        name = local_name(el.tag)
+
+        if name == "Prefix":
+            self.prefixes[self.attribute(el, "name")] = self.attribute(el, "IRI")
+            return
+        if name == "Import":
+            self.emit(self.ontology, OWL + "imports", urljoin(self.base, (el.text or "").strip()))
+            return
+        if name == "Annotation":
+            children = self.operands(el)
+            if len(children) != 2:
+                raise UnsupportedConstruct(f"Annotation with {len(children)} operands")
+            prop, value = children
+            self.emit(self.ontology, self.entity(prop, "AnnotationProperty"), self.annotation_node(value))
+            return
+
+        children = self.operands(el)
+
+        if name == "Declaration" and len(children) == 1:
+            kind = local_name(children[0].tag)
+            if kind in DECLARATION_TYPES:
+                self.emit(self.resolve(children[0]), RDF_TYPE, DECLARATION_TYPES[kind])
+                return
+
+        elif name in PROPERTY_CHARACTERISTICS and len(children) == 1:
+            kind = "DataProperty" if "Data" in name else "ObjectProperty"
+            self.emit(self.entity(children[0], kind), RDF_TYPE, PROPERTY_CHARACTERISTICS[name])
+            return
+
+        elif name in BINARY_AXIOMS and len(children) == 2:
+            first, second, predicate = BINARY_AXIOMS[name]
+            a = self.entity(children[0], first)
+            b = self.entity(children[1], second)
+            if name == "ClassAssertion":
+                self.emit(b, predicate, a)
+            else:
+                self.emit(a, predicate, b)
+            return
+
+        elif name in PAIR_AXIOMS and len(children) == 2:
+            kind, predicate = PAIR_AXIOMS[name]
+            self.emit(self.entity(children[0], kind), predicate, self.entity(children[1], kind))
+            return
+
+        elif name == "ObjectPropertyAssertion" and len(children) == 3:
+            prop = self.entity(children[0], "ObjectProperty")
+            self.emit(self.entity(children[1], "Individual"), prop, self.entity(children[2], "Individual"))
+            return
+
+        elif name == "DataPropertyAssertion" and len(children) == 3:
+            prop = self.entity(children[0], "DataProperty")
+            if local_name(children[2].tag) == "Literal":
+                self.emit(self.entity(children[1], "Individual"), prop, self.literal(children[2]))
+                return
+
+        elif name == "AnnotationAssertion" and len(children) == 3:
+            prop = self.entity(children[0], "AnnotationProperty")
+            subject = self.annotation_node(children[1])
+            if not isinstance(subject, Literal):
+                self.emit(subject, prop, self.annotation_node(children[2]))
+                return
+
+        raise UnsupportedConstruct(f"Unsupported axiom: {name}")
+
+    def convert(self, source):
+        depth = 0
+        root = None
+        for event, el in iterparse(source, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    if el.tag != "{%s}Ontology" % OWL:
+                        raise UnsupportedConstruct("Input is not OWL/XML")
+                    root = el
+                    self.start_ontology(el)
+                continue
+
+            depth -= 1
+            if depth == 1:
+                try:
+                    self.handle(el)
+                except (KeyError, ValueError, IndexError) as e:
+                    # Cualquier forma inesperada del axioma se delega a owlready2
+                    raise UnsupportedConstruct(f"Malformed {local_name(el.tag)}: {e!r}") from e
+                # Liberar el axioma ya traducido
+                root.clear()
+        self.writer.end()
+
+    def start_ontology(self, el):
+        iri = el.attrib.get("ontologyIRI")
+        self.base = el.attrib.get(XML_BASE) or iri or ""
+        self.ontology = iri if iri else BNode("ontology")
+        self.writer.start()
+        self.emit(self.ontology, RDF_TYPE, OWL + "Ontology")
+        if "versionIRI" in el.attrib:
+            self.emit(self.ontology, OWL + "versionIRI", el.attrib["versionIRI"])
+
+
+def convert_streaming(input_path, fmt):
+    writer_class = NTriplesWriter if fmt == "ntriples" else RdfXmlWriter
+    output_path = input_path + writer_class.extension
+    tmp_path = output_path + ".part"
     try:
-        # Cargar la ontología
-        # Owlready2 detecta automáticamente el formato (OWL/XML, RDF/XML, etc.)
-        onto = get_ontology(input_path).load()
-        
-        # Generar ruta de salida
-        output_path = input_path + ".rdf"
-        
-        # Guardar en formato RDF/XML
-        onto.save(file=output_path, format="rdfxml")
-        
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            converter = StreamingOwlXmlConverter(writer_class(out))
+            converter.convert(input_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path, converter.triples
+
+
+def convert_owlready(input_path, fmt):
+    from owlready2 import get_ontology
+
+    # Cargar la ontología
+    # Owlready2 detecta automáticamente el formato (OWL/XML, RDF/XML, etc.)
+    onto = get_ontology(input_path).load()
+
+    # Generar ruta de salida
+    output_path = input_path + (".nt" if fmt == "ntriples" else ".rdf")
+
+    onto.save(file=output_path, format=fmt)
+    return output_path, None
+
+
+def convert_owl_to_rdf(input_path, engine="streaming", fmt="rdfxml", stats=False):
+    try:
+        started = time.perf_counter()
+        used_engine = engine
+        if engine == "streaming":
+            try:
+                output_path, triples = convert_streaming(input_path, fmt)
+            except UnsupportedConstruct as e:
+                print(f"Streaming converter fallback to owlready2: {e}", file=sys.stderr)
+                used_engine = "owlready2"
+                output_path, triples = convert_owlready(input_path, fmt)
+        else:
+            output_path, triples = convert_owlready(input_path, fmt)
+        elapsed = time.perf_counter() - started
+
+        if stats:
+            size_mb = os.path.getsize(input_path) / (1024 * 1024)
+            report = {
+                "engine": used_engine,
+                "seconds": round(elapsed, 3),
+                "input_mb": round(size_mb, 2),
+                "mb_per_sec": round(size_mb / elapsed, 2) if elapsed else None,
+                "triples": triples,
+                "triples_per_sec": round(triples / elapsed) if triples and elapsed else None,
+                "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+            }
+            print(f"stats: {json.dumps(report)}", file=sys.stderr)
+
         print(output_path)
         return 0
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         return 1
 
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python convert_owl.py <input_file>", file=sys.stderr)
-        sys.exit(1)
-        
-    input_file = sys.argv[1]
-    sys.exit(convert_owl_to_rdf(input_file))
+    parser = argparse.ArgumentParser(description="Convert OWL/XML to RDF/XML or N-Triples")
+    parser.add_argument("input_file")
+    parser.add_argument("--engine", choices=["streaming", "owlready2"], default="streaming",
+                        help="streaming falls back to owlready2 on unsupported constructs")
+    parser.add_argument("--format", choices=["rdfxml", "ntriples"], default="rdfxml")
+    parser.add_argument("--stats", action="store_true",
+                        help="print elapsed time, throughput and peak RSS to stderr")
+    args = parser.parse_args()
+
+    sys.exit(convert_owl_to_rdf(args.input_file, args.engine, args.format, args.stats))
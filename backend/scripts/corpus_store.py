@@ -0,0 +1,303 @@
+import sys
+import os
+import json
+import mmap
+import time
+import argparse
+import subprocess
+from array import array
+from contextlib import contextmanager
+
+from memory_usage import peak_rss_mb
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "harvested_data")
+LANGUAGES = ["es", "en", "pt"]
+
+MAGIC = b"SSCORP01"
+ALIGN = 8
+
+# Diccionarios de strings internados: cada uno es offsets (u32) + bytes UTF-8
+DICTIONARIES = ["uri", "genre", "network", "text"]
+# Columnas por fila (u32): índice en el diccionario correspondiente
+COLUMNS = {
+    "entity": "uri",
+    "genre": "genre",
+    "network": "network",
+    "label": "text",
+    "abstract": "text",
+    "startDate": "text",
+}
+FIELDS = {"uri": "entity", "label": "label", "abstract": "abstract",
+          "genre": "genre", "network": "network", "startDate": "startDate"}
+
+
+def corpus_path(lang, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"series_{lang}.corpus")
+
+
+def json_path(lang, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"series_{lang}.json")
+
+
+class StringTable:
+    """Interna strings y asigna ids consecutivos; el id 0 es siempre la cadena vacía."""
+
+    def __init__(self):
+        self.ids = {"": 0}
+        self.values = [""]
+
+    def intern(self, value):
+        value = value or ""
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def encode(self):
+        offsets = array("I", [0])
+        blob = bytearray()
+        for value in self.values:
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        return offsets.tobytes(), bytes(blob)
+
+
+def build_corpus(records, output_path):
+    """Escribe los registros cosechados en formato columnar."""
+    tables = {name: StringTable() for name in DICTIONARIES}
+    columns = {name: array("I") for name in COLUMNS}
+
+    # La cosecha PT duplica la URI en "resource"; se guarda como un flag
+    aliases_resource = bool(records) and all("resource" in r for r in records)
+    expected = set(FIELDS) | ({"resource"} if aliases_resource else set())
+    for record in records:
+        # Solo se guardan campos fijos de tipo string: cualquier otra cosa no se
+        # leería igual que con json.load
+        if set(record) != expected:
+            raise ValueError(f"Unexpected fields for {record.get('uri')}: "
+                             f"missing {sorted(expected - set(record))}, extra {sorted(set(record) - expected)}")
+        if not all(isinstance(value, str) for value in record.values()):
+            raise ValueError(f"Non-string field for {record['uri']}")
+        if aliases_resource and record["resource"] != record["uri"]:
+            raise ValueError(f"'resource' differs from 'uri' for {record['resource']}")
+        for field, column in FIELDS.items():
+            columns[column].append(tables[COLUMNS[column]].intern(record[field]))
+
+    sections = []
+    for name in DICTIONARIES:
+        offsets, blob = tables[name].encode()
+        sections.append((f"{name}.offsets", "I", offsets))
+        sections.append((f"{name}.bytes", "B", blob))
+    for name, values in columns.items():
+        sections.append((f"col.{name}", "I", values.tobytes()))
+
+    # Los offsets de cada sección son relativos al inicio de la zona de datos,
+    # que empieza alineada justo después de la cabecera
+    layout = {}
+    offset = 0
+    for name, typecode, payload in sections:
+        layout[name] = [offset, len(payload), typecode]
+        offset = _align(offset + len(payload))
+    header = json.dumps({"rows": len(columns["entity"]), "byteorder": sys.byteorder,
+                         "resource": aliases_resource, "sections": layout}).encode()
+    data_start = _align(len(MAGIC) + 4 + len(header))
+
+    tmp_path = output_path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        for name, _, payload in sections:
+            f.seek(data_start + layout[name][0])
+            f.write(payload)
+    os.replace(tmp_path, output_path)
+    return len(columns["entity"]), {name: len(table.values) for name, table in tables.items()}
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class CorpusStore:
+    """
+    Vista de solo lectura sobre un archivo .corpus mapeado en memoria.
+    Las columnas son memoryviews sobre el mmap, así que abrir el corpus no
+    copia datos y varios procesos comparten las mismas páginas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a corpus file: {path}")
+
+        header_len = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 4], "little")
+        start = len(MAGIC) + 4
+        header = json.loads(self._mm[start:start + header_len])
+        if header["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError(f"Corpus built on a {header['byteorder']}-endian machine: {path}")
+
+        self.rows = header["rows"]
+        self.aliases_resource = header.get("resource", False)
+        # Los diccionarios pequeños (URIs, géneros, cadenas) se decodifican una sola vez
+        self._decoded = {"uri": {}, "genre": {}, "network": {}}
+        data_start = _align(start + header_len)
+        view = memoryview(self._mm)
+        self._sections = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            offset += data_start
+            self._sections[name] = view[offset:offset + length].cast(typecode)
+        view.release()
+
+    def close(self):
+        for section in getattr(self, "_sections", {}).values():
+            section.release()
+        self._sections = {}
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.rows
+
+    def string(self, dictionary, idx):
+        cache = self._decoded.get(dictionary)
+        if cache is not None and idx in cache:
+            return cache[idx]
+        offsets = self._sections[f"{dictionary}.offsets"]
+        value = bytes(self._sections[f"{dictionary}.bytes"][offsets[idx]:offsets[idx + 1]]).decode("utf-8")
+        if cache is not None:
+            cache[idx] = value
+        return value
+
+    def dictionary_size(self, dictionary):
+        return len(self._sections[f"{dictionary}.offsets"]) - 1
+
+    def column(self, name):
+        """Ids codificados de una columna (memoryview de u32, sin copiar)."""
+        return self._sections[f"col.{name}"]
+
+    def value(self, row, field):
+        column = FIELDS[field]
+        return self.string(COLUMNS[column], self._sections[f"col.{column}"][row])
+
+    def entity(self, row):
+        """Índice de entidad (id de URI) al que pertenece la fila."""
+        return self._sections["col.entity"][row]
+
+    def record(self, row):
+        record = {field: self.value(row, field) for field in FIELDS}
+        if self.aliases_resource:
+            record["resource"] = record["uri"]
+        return record
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.record(row) for row in range(*key.indices(self.rows))]
+        if key < 0:
+            key += self.rows
+        if not 0 <= key < self.rows:
+            raise IndexError(key)
+        return self.record(key)
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self.record(row)
+
+
+@contextmanager
+def load_series(lang, data_dir=DATA_DIR):
+    """
+    Context manager con las series cosechadas de un idioma.
+    Usa el .corpus si existe y está al día con el JSON (y lo cierra al salir);
+    si no, cae a json.load.
+    """
+    source = json_path(lang, data_dir)
+    compact = corpus_path(lang, data_dir)
+    if os.path.exists(compact) and (not os.path.exists(source)
+                                    or os.path.getmtime(compact) >= os.path.getmtime(source)):
+        with CorpusStore(compact) as store:
+            yield store
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield data
+
+
+def measure(mode, lang, data_dir):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "json":
+        with open(json_path(lang, data_dir), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows = len(data)
+    else:
+        data = CorpusStore(corpus_path(lang, data_dir))
+        rows = len(data)
+    opened = time.perf_counter() - started
+    # Leer una columna completa: en el corpus solo se decodifica esa columna
+    if mode == "json":
+        chars = sum(len(r["abstract"]) for r in data)
+    else:
+        chars = sum(len(data.value(row, "abstract")) for row in range(rows))
+    scanned = time.perf_counter() - started
+    report = {"mode": mode, "lang": lang, "rows": rows, "chars": chars,
+              "open_ms": round(opened * 1000, 2), "scan_ms": round(scanned * 1000, 2),
+              "rss_delta_mb": round((peak_rss_mb() or 0) - (baseline or 0), 1)}
+    if mode != "json":
+        data.close()
+    print(json.dumps(report))
+
+
+def build(langs, data_dir):
+    for lang in langs:
+        source = json_path(lang, data_dir)
+        if not os.path.exists(source):
+            print(f"Skipping {lang}: {source} not found")
+            continue
+        with open(source, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        output = corpus_path(lang, data_dir)
+        rows, sizes = build_corpus(records, output)
+        print(f"Built {output}: {rows} rows, "
+              f"{os.path.getsize(source) / 1e6:.2f} MB JSON -> {os.path.getsize(output) / 1e6:.2f} MB, "
+              f"dictionaries {sizes}")
+
+
+def bench(langs, data_dir):
+    print(f"{'lang':>4} {'mode':>7} {'open ms':>9} {'scan ms':>9} {'RSS delta MB':>13}")
+    for lang in langs:
+        if not os.path.exists(corpus_path(lang, data_dir)):
+            build([lang], data_dir)
+        for mode in ["json", "corpus"]:
+            # Un proceso por medición para que el pico de RSS no se acumule
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "measure", mode, lang, "--data-dir", data_dir],
+                capture_output=True, text=True, check=True
+            )
+            r = json.loads(result.stdout)
+            print(f"{lang:>4} {mode:>7} {r['open_ms']:>9} {r['scan_ms']:>9} {r['rss_delta_mb']:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar, memory-mapped store for harvested series")
+    parser.add_argument("command", choices=["build", "bench", "measure"])
+    parser.add_argument("args", nargs="*", help="languages (build/bench) or mode and language (measure)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.args or LANGUAGES, args.data_dir)
+    elif args.command == "bench":
+        bench(args.args or LANGUAGES, args.data_dir)
+    else:
+        measure(args.args[0], args.args[1], args.data_dir)
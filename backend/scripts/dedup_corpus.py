@@ -0,0 +1,314 @@
+import sys
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+from collections import defaultdict
+
+from corpus_store import DATA_DIR, LANGUAGES, corpus_path, json_path, load_series
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_WORDS = 3
+# Abstracts más cortos se comparan solo por coincidencia exacta
+MIN_ABSTRACT_CHARS = 120
+JACCARD_THRESHOLD = 0.7
+COSINE_THRESHOLD = 0.9
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Separa los valores prestados de bins vecinos de los propios
+ROTATION_OFFSET = 1 << 58
+
+
+def normalize(text):
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+def shingles(text):
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def stable_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    """
+    MinHash de una sola permutación (one permutation hashing): cada shingle se
+    hashea una vez y cae en uno de num_perm bins, donde se guarda el mínimo.
+    Los bins vacíos se rellenan con el siguiente bin ocupado (densificación por
+    rotación), así el coste es O(shingles) en vez de O(shingles * num_perm).
+    """
+
+    def __init__(self, num_perm=NUM_PERM):
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        k = self.num_perm
+        bins = [None] * k
+        for s in shingles(text):
+            h = stable_hash(s)
+            b, v = h % k, h // k
+            if bins[b] is None or v < bins[b]:
+                bins[b] = v
+        signature = []
+        for i in range(k):
+            for offset in range(k):
+                value = bins[(i + offset) % k]
+                if value is not None:
+                    signature.append(value + offset * ROTATION_OFFSET)
+                    break
+        return signature
+
+
+def estimated_jaccard(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def lsh_candidates(signatures, bands=BANDS):
+    """
+    Pares candidatos: documentos que coinciden en al menos una banda completa.
+    Cada banda toma bins salteados (band, band + bands, ...) para que los bins
+    rellenados desde el mismo vecino no caigan en la misma banda.
+    """
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for doc, sig in signatures.items():
+            buckets[tuple(sig[band::bands])].append(doc)
+        for members in buckets.values():
+            if len(members) > 1:
+                for i in range(len(members)):
+                    for j in range(i + 1, len(members)):
+                        candidates.add((members[i], members[j]))
+    return candidates
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def collect_documents(langs, data_dir=DATA_DIR):
+    """
+    Un documento por (idioma, URI): las filas repetidas por género/cadena se
+    colapsan y se usa el abstract más largo, o el label si no hay abstract.
+    """
+    documents = {}
+    rows = 0
+    for lang in langs:
+        with load_series(lang, data_dir) as series:
+            for record in series:
+                rows += 1
+                key = (lang, record["uri"])
+                doc = documents.setdefault(key, {"label": record["label"], "abstract": ""})
+                if len(record["abstract"]) > len(doc["abstract"]):
+                    doc["abstract"] = record["abstract"]
+    return documents, rows
+
+
+def embed_texts(url, texts, batch_size=64):
+    import requests
+
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        response = requests.post(f"{url}/embed", json={"texts": texts[i:i + batch_size]}, timeout=120)
+        response.raise_for_status()
+        vectors.extend(response.json()["embeddings"])
+    return vectors
+
+
+def find_clusters(documents, jaccard=JACCARD_THRESHOLD, embeddings_url=None, cosine=COSINE_THRESHOLD):
+    timings = {}
+    uf = UnionFind()
+
+    # 1. Coincidencias exactas: abstracts largos idénticos tras normalizar, o la
+    #    misma URI en varios idiomas con el mismo label y abstract. Si el label
+    #    cambia (traducciones PT) las filas se conservan: cada idioma solo
+    #    encuentra sus propios labels en la búsqueda
+    started = time.perf_counter()
+    exact = {}
+    long_docs = {}
+    for key, doc in documents.items():
+        keys = [("uri", key[1], normalize(doc["label"]), normalize(doc["abstract"]))]
+        if len(doc["abstract"]) >= MIN_ABSTRACT_CHARS:
+            keys.append(("abstract", normalize(doc["abstract"])))
+            long_docs[key] = doc["abstract"]
+        for text_key in keys:
+            if text_key in exact:
+                uf.union(exact[text_key], key)
+            else:
+                exact[text_key] = key
+    timings["exact_s"] = time.perf_counter() - started
+
+    # 2. MinHash + LSH solo sobre un abstract largo por grupo exacto
+    started = time.perf_counter()
+    hasher = MinHasher()
+    representatives = {}
+    for key in long_docs:
+        representatives.setdefault(uf.find(key), key)
+    signatures = {key: hasher.signature(long_docs[key]) for key in representatives.values()}
+    timings["minhash_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    candidates = lsh_candidates(signatures) if signatures else set()
+    accepted = [(a, b) for a, b in candidates if estimated_jaccard(signatures[a], signatures[b]) >= jaccard]
+    timings["lsh_s"] = time.perf_counter() - started
+
+    # 3. Confirmación opcional con el servicio de embeddings
+    rejected = 0
+    if embeddings_url and accepted:
+        started = time.perf_counter()
+        keys = sorted({k for pair in accepted for k in pair})
+        vectors = dict(zip(keys, embed_texts(embeddings_url, [long_docs[k] for k in keys])))
+        confirmed = []
+        for a, b in accepted:
+            # El servicio devuelve vectores normalizados: el producto escalar es el coseno
+            if sum(x * y for x, y in zip(vectors[a], vectors[b])) >= cosine:
+                confirmed.append((a, b))
+        rejected = len(accepted) - len(confirmed)
+        accepted = confirmed
+        timings["embedding_s"] = time.perf_counter() - started
+
+    for a, b in accepted:
+        uf.union(a, b)
+
+    groups = defaultdict(list)
+    for key in documents:
+        groups[uf.find(key)].append(key)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        canonical = min(members, key=lambda k: (-len(documents[k]["abstract"]), LANGUAGES.index(k[0])
+                                                if k[0] in LANGUAGES else len(LANGUAGES), k[1]))
+        clusters.append({
+            "canonical": {"lang": canonical[0], "uri": canonical[1]},
+            "members": [{"lang": lang, "uri": uri} for lang, uri in sorted(members) if (lang, uri) != canonical],
+        })
+
+    n = len(signatures)
+    stats = {
+        "documents": len(documents),
+        "minhash_documents": n,
+        "brute_force_pairs": n * (n - 1) // 2,
+        "candidate_pairs": len(candidates),
+        "accepted_pairs": len(accepted),
+        "embedding_rejected_pairs": rejected,
+        "clusters": len(clusters),
+        "redundant_documents": sum(len(c["members"]) for c in clusters),
+    }
+    stats.update({k: round(v, 3) for k, v in timings.items()})
+    return clusters, stats
+
+
+def clusters_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, "dedup_clusters.json")
+
+
+def source_fingerprint(lang, data_dir=DATA_DIR):
+    """sha1 del JSON cosechado (o del .corpus si no hay JSON), para detectar clusters obsoletos."""
+    path = json_path(lang, data_dir)
+    if not os.path.exists(path):
+        path = corpus_path(lang, data_dir)
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_redundant(data_dir=DATA_DIR):
+    """
+    Conjunto de (idioma, URI) que no son canónicos en su cluster.
+    Vacío si todavía no se ejecutó la deduplicación o si los datos cosechados
+    cambiaron desde entonces (se avisa por stderr).
+    """
+    path = clusters_path(data_dir)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    sources = data.get("sources")
+    if not sources:
+        print(f"Ignoring {path}: no source fingerprints, re-run dedup_corpus.py", file=sys.stderr)
+        return set()
+    stale = [lang for lang, fingerprint in sources.items() if source_fingerprint(lang, data_dir) != fingerprint]
+    if stale:
+        print(f"Ignoring {path}: harvested data changed for {', '.join(stale)}, re-run dedup_corpus.py",
+              file=sys.stderr)
+        return set()
+    return {(m["lang"], m["uri"]) for c in data["clusters"] for m in c["members"]}
+
+
+def enlarge(documents, factor, seed=7):
+    """Corpus sintético: copias con palabras borradas o cambiadas para crear casi-duplicados."""
+    rng = random.Random(seed)
+    enlarged = dict(documents)
+    for copy in range(1, factor):
+        for (lang, uri), doc in documents.items():
+            words = doc["abstract"].split()
+            for _ in range(max(1, len(words) // 50)):
+                if words:
+                    words[rng.randrange(len(words))] = f"w{rng.randrange(10 ** 6)}"
+            enlarged[(lang, f"{uri}#copy{copy}")] = {"label": doc["label"], "abstract": " ".join(words)}
+    return enlarged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate clustering for harvested series")
+    parser.add_argument("langs", nargs="*", default=LANGUAGES)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", help="defaults to dedup_clusters.json in --data-dir")
+    parser.add_argument("--jaccard", type=float, default=JACCARD_THRESHOLD)
+    parser.add_argument("--embeddings-url", help="confirm candidates with the embedding service, e.g. http://localhost:5000")
+    parser.add_argument("--cosine", type=float, default=COSINE_THRESHOLD)
+    parser.add_argument("--scale", type=int, default=1,
+                        help="benchmark on a synthetic corpus N times larger (does not write clusters)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    documents, rows = collect_documents(args.langs, args.data_dir)
+    print(f"Loaded {rows} rows -> {len(documents)} documents in {time.perf_counter() - started:.2f}s")
+
+    if args.scale > 1:
+        documents = enlarge(documents, args.scale)
+        print(f"Synthetic corpus: {len(documents)} documents")
+
+    started = time.perf_counter()
+    clusters, stats = find_clusters(documents, args.jaccard, args.embeddings_url, args.cosine)
+    stats["total_s"] = round(time.perf_counter() - started, 3)
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    if args.scale == 1:
+        output = args.output or clusters_path(args.data_dir)
+        sources = {lang: source_fingerprint(lang, args.data_dir) for lang in args.langs}
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"sources": sources, "stats": stats, "clusters": clusters}, f, ensure_ascii=False, indent=2)
+        print(f"Saved {len(clusters)} clusters to {output}")
+
+
+if __name__ == "__main__":
+    main()
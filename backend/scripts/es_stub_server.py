@@ -0,0 +1,219 @@
+import json
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class StubState:
+    """Índices, alias y contadores del servidor de prueba."""
+
+    def __init__(self, reject_rate=0.0, seed=1):
+        self.lock = threading.Lock()
+        self.indices = {}
+        self.aliases = {}
+        self.reject_rate = reject_rate
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.bulk_requests = 0
+        self.rejected_items = 0
+
+    def resolve(self, name):
+        targets = self.aliases.get(name)
+        if targets:
+            if len(targets) > 1:
+                return None
+            return next(iter(targets))
+        return name if name in self.indices else None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Imita el subconjunto de la API de Elasticsearch que usa bulk_index.py:
+    creación de índices, _settings, _refresh, _count, _alias/_aliases, _reindex y _bulk.
+    Con reject_rate > 0 responde 429 a una fracción de los items del _bulk.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body=None):
+        payload = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def parts(self):
+        return [p for p in urlparse(self.path).path.split("/") if p]
+
+    def do_HEAD(self):
+        state = self.server.state
+        parts = self.parts()
+        with state.lock:
+            exists = len(parts) == 1 and (parts[0] in state.indices or parts[0] in state.aliases)
+        self.send_json(200 if exists else 404)
+
+    def do_GET(self):
+        state = self.server.state
+        parts = self.parts()
+        with state.lock:
+            if len(parts) == 2 and parts[0] == "_alias":
+                found = {index: {"aliases": {parts[1]: {}}} for index in state.aliases.get(parts[1], ())}
+                return self.send_json(200 if found else 404, found or {"error": "alias missing", "status": 404})
+            if len(parts) == 2 and parts[1] == "_count":
+                index = state.resolve(parts[0])
+                if index is None:
+                    return self.send_json(404, {"error": "index_not_found_exception", "status": 404})
+                return self.send_json(200, {"count": len(state.indices[index]["docs"])})
+        self.send_json(404, {"error": "not found", "status": 404})
+
+    def do_PUT(self):
+        state = self.server.state
+        parts = self.parts()
+        body = json.loads(self.read_body() or b"{}")
+        with state.lock:
+            if len(parts) == 1:
+                if parts[0] in state.indices or parts[0] in state.aliases:
+                    return self.send_json(400, {"error": {"type": "resource_already_exists_exception"}, "status": 400})
+                state.indices[parts[0]] = {"docs": {}, "mappings": body.get("mappings", {}),
+                                           "settings": body.get("settings", {})}
+                return self.send_json(200, {"acknowledged": True, "index": parts[0]})
+            if len(parts) == 2 and parts[1] == "_settings":
+                index = state.resolve(parts[0])
+                if index is None:
+                    return self.send_json(404, {"error": "index_not_found_exception", "status": 404})
+                state.indices[index]["settings"].update(body.get("index", body))
+                return self.send_json(200, {"acknowledged": True})
+        self.send_json(404, {"error": "not found", "status": 404})
+
+    def do_DELETE(self):
+        state = self.server.state
+        parts = self.parts()
+        with state.lock:
+            if len(parts) == 1 and parts[0] in state.indices:
+                del state.indices[parts[0]]
+                for targets in state.aliases.values():
+                    targets.discard(parts[0])
+                return self.send_json(200, {"acknowledged": True})
+        self.send_json(404, {"error": "index_not_found_exception", "status": 404})
+
+    def do_POST(self):
+        state = self.server.state
+        parts = self.parts()
+        body = self.read_body()
+
+        if parts and parts[-1] == "_bulk":
+            return self.bulk(parts[0] if len(parts) == 2 else None, body)
+
+        with state.lock:
+            if parts == ["_aliases"]:
+                return self.update_aliases(json.loads(body))
+            if parts == ["_reindex"]:
+                return self.reindex(json.loads(body))
+            if len(parts) == 2 and parts[1] == "_refresh":
+                return self.send_json(200, {"_shards": {"failed": 0}})
+        self.send_json(404, {"error": "not found", "status": 404})
+
+    def update_aliases(self, body):
+        state = self.server.state
+        # Validar todo antes de aplicar, para que el cambio sea atómico
+        for action in body.get("actions", []):
+            (kind, params), = action.items()
+            if params["index"] not in state.indices:
+                return self.send_json(404, {"error": "index_not_found_exception", "status": 404})
+        for action in body.get("actions", []):
+            (kind, params), = action.items()
+            if kind == "add":
+                state.aliases.setdefault(params["alias"], set()).add(params["index"])
+            elif kind == "remove":
+                state.aliases.get(params["alias"], set()).discard(params["index"])
+            elif kind == "remove_index":
+                del state.indices[params["index"]]
+        state.aliases = {alias: targets for alias, targets in state.aliases.items() if targets}
+        self.send_json(200, {"acknowledged": True})
+
+    def reindex(self, body):
+        """Solo la forma que usa bulk_index.py: query bool.must_not con un term."""
+        state = self.server.state
+        sources = body["source"]["index"]
+        sources = [sources] if isinstance(sources, str) else sources
+        excluded = body["source"].get("query", {}).get("bool", {}).get("must_not", {}).get("term", {})
+        dest = state.resolve(body["dest"]["index"])
+        indices = [state.resolve(name) for name in sources]
+        if dest is None or None in indices:
+            return self.send_json(404, {"error": "index_not_found_exception", "status": 404})
+        total = 0
+        for index in indices:
+            for doc_id, source in state.indices[index]["docs"].items():
+                if any(source.get(field) == value for field, value in excluded.items()):
+                    continue
+                state.indices[dest]["docs"][doc_id] = source
+                total += 1
+        self.send_json(200, {"took": 1, "total": total, "created": total, "failures": []})
+
+    def bulk(self, default_index, body):
+        state = self.server.state
+        lines = body.decode("utf-8").splitlines()
+        # Parsear fuera del lock para que las peticiones concurrentes no se serialicen
+        operations = [(json.loads(lines[i])["index"], json.loads(lines[i + 1]))
+                      for i in range(0, len(lines) - 1, 2)]
+        items = []
+        errors = False
+        with state.lock:
+            state.bulk_requests += 1
+            for action, source in operations:
+                index = state.resolve(action.get("_index", default_index))
+                if index is None:
+                    status = 404
+                elif state.indices[index]["settings"].get("blocks.write"):
+                    status = 403
+                elif state.reject_rate and state.rng.random() < state.reject_rate:
+                    status = 429
+                    state.rejected_items += 1
+                else:
+                    state.indices[index]["docs"][action["_id"]] = source
+                    status = 201
+                item = {"_index": index, "_id": action.get("_id"), "status": status}
+                if status >= 300:
+                    errors = True
+                    item["error"] = {"type": {429: "es_rejected_execution_exception",
+                                              403: "cluster_block_exception"}.get(status, "index_not_found_exception")}
+                items.append({"index": item})
+        self.send_json(200, {"took": 1, "errors": errors, "items": items})
+
+
+def start_stub(port=0, reject_rate=0.0):
+    """Arranca el servidor en un hilo y devuelve (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(reject_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Elasticsearch _bulk API")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--reject-rate", type=float, default=0.0,
+                        help="fraction of bulk items answered with 429")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(args.reject_rate)
+    print(f"Elasticsearch stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
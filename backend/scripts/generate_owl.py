@@ -1,7 +1,9 @@
-import json
 import os
 import re
 
+from corpus_store import load_series
+from dedup_corpus import load_redundant
+
 def escape_xml(text):
     if not text:
         return ""
@@ -28,16 +30,24 @@ def generate_owl():
     data_dir = os.path.join(script_dir, "..", "harvested_data")
     output_file = os.path.join(script_dir, "..", "uploads", "tv_series_kb.owl")
     
+    # Series already covered by a canonical entity (see dedup_corpus.py)
+    redundant = load_redundant(data_dir)
+
     # Load all language data
     all_series = []
     for lang in ['es', 'en', 'pt']:
         file_path = os.path.join(data_dir, f"series_{lang}.json")
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for s in data[:100]:  # 100 per language = 300 total
+            count = 0
+            with load_series(lang, data_dir) as data:
+                for s in data:
+                    if count == 100:  # 100 per language = 300 total
+                        break
+                    if (lang, s['uri']) in redundant:
+                        continue
                     s['language'] = lang
                     all_series.append(s)
+                    count += 1
     
     genres = set()
     networks = set()
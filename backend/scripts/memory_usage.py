@@ -0,0 +1,12 @@
+import sys
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso en MB, o None si la plataforma no lo expone."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+from bulk_index import (BulkIndexer, KeepAliveConnection, blue_green, bulk_item, ensure_index,
+                        pack_bulk_bodies, synthetic_documents, attach_vectors)
+from es_stub_server import start_stub
+
+ALIAS = "semantic-triples"
+DIMS = 8
+
+
+def index_documents(url, index, documents, document_label="harvested_data", max_retries=10):
+    indexer = BulkIndexer(url, index, concurrency=2, max_retries=max_retries, backoff=0.001)
+    bodies = pack_bulk_bodies((bulk_item(doc, document_label) for doc in documents), max_docs=50)
+    return indexer.run(bodies)
+
+
+def test_retries_rejected_items():
+    server, url = start_stub(reject_rate=0.2)
+    try:
+        admin = KeepAliveConnection(url)
+        ensure_index(admin, "series", DIMS)
+        admin.close()
+        stats = index_documents(url, "series", attach_vectors(synthetic_documents(1000), synthetic_dims=DIMS))
+        state = server.state
+        assert state.rejected_items > 0
+        assert stats["failed"] == 0 and stats["docs"] == 1000
+        assert len(state.indices["series"]["docs"]) == 1000
+    finally:
+        server.shutdown()
+
+
+def test_blue_green_keeps_uploads():
+    server, url = start_stub(reject_rate=0.1)
+    admin = KeepAliveConnection(url)
+    try:
+        state = server.state
+        # Índice concreto como el que crea Node, con una ontología subida y datos cosechados viejos
+        ensure_index(admin, ALIAS, DIMS)
+        upload = {"lang": "es", "uri": "http://example.org/upload#A", "subject": "http://example.org/upload#A",
+                  "predicate": "http://www.w3.org/2000/01/rdf-schema#label", "object": "A", "label": "A"}
+        stale = dict(upload, uri="http://example.org/tv-series#Old", subject="http://example.org/tv-series#Old")
+        index_documents(url, ALIAS, [upload], document_label="ontology-1")
+        index_documents(url, ALIAS, [stale])
+
+        def index_into(index):
+            return index_documents(url, index, attach_vectors(synthetic_documents(300), synthetic_dims=DIMS))
+
+        stats, old_indices = blue_green(admin, ALIAS, DIMS, True, index_into)
+        first, = state.aliases[ALIAS]
+        docs = state.indices[first]["docs"]
+        assert stats["failed"] == 0 and old_indices == []
+        assert ALIAS not in state.indices
+        assert len(docs) == 301
+        assert sum(1 for d in docs.values() if d["documentId"] == "ontology-1") == 1
+        assert not any(d["subject"].endswith("#Old") for d in docs.values())
+
+        # Segunda carga desde el alias: la subida nueva también sobrevive
+        index_documents(url, ALIAS, [dict(upload, uri="http://example.org/upload#B")], document_label="ontology-2")
+        _, old_indices = blue_green(admin, ALIAS, DIMS, False, index_into)
+        second, = state.aliases[ALIAS]
+        assert second != first and old_indices == [first]
+        assert {d["documentId"] for d in state.indices[second]["docs"].values()} == \
+            {"harvested_data", "ontology-1", "ontology-2"}
+    finally:
+        admin.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for test in (test_retries_rejected_items, test_blue_green_keeps_uploads):
+        test()
+        print(f"✓ {test.__name__}")